@@ -1,5 +1,16 @@
+import csv
 import os
+import re
+import sys
+import tempfile
 import unittest
+from array import array
+from itertools import compress
+from statistics import fmean
+
+
+# matches a sample such as "1880 LV", capturing the size and the type
+_SAMPLE_RE = re.compile(r'\s*(\d+)\s+(\S+)\s*')
 
 
 class PollReader():
@@ -8,11 +19,10 @@ class PollReader():
     """
     def __init__(self, filename):
         """
-        The constructor. Opens up the specified file, reads in the data,
-        closes the file handler, and sets up the data dictionary that will be
-        populated with build_data_dict().
-
-        We have implemented this for you. You should not need to modify it.
+        The constructor. Works out the full path to the specified file and
+        sets up the data dictionary that will be populated with
+        build_data_dict(). The file itself is not read until
+        build_data_dict() is called.
         """
 
         # this is used to get the base path that this Python file is in in an
@@ -24,58 +34,125 @@ class PollReader():
         # join the base path with the passed filename
         self.full_path = os.path.join(self.base_path, filename)
 
-        # open up the file handler
-        self.file_obj = open(self.full_path, 'r')
+        # the raw lines of the file, read in by build_data_dict()
+        self.raw_data = None
+
+        # whether build_data_dict() has already run
+        self._built = False
+
+        # which rows are likely voter polls, filled in by build_data_dict()
+        self._lv_mask = []
 
-        # read in each line of the file to a list
-        self.raw_data = self.file_obj.readlines()
+        # the Harris and Trump result columns, in that order
+        self._results = ()
 
-        # close the file handler
-        self.file_obj.close()
+        # the Harris and Trump averages over the first and last 30 polls,
+        # filled in by build_data_dict()
+        self._first30_mean = (0.0, 0.0)
+        self._last30_mean = (0.0, 0.0)
+
+        # the answer from highest_polling_candidate(), saved the first time
+        # it is worked out
+        self._highest = None
 
         # set up the data dict that we will fill in later
+        # the numeric columns are stored as typed arrays so the values are
+        # packed together instead of each being a separate Python object
         self.data_dict = {
             'month': [],
-            'date': [],
-            'sample': [],
+            'date': array('q'),
+            'sample': array('q'),
             'sample type': [],
-            'Harris result': [],
-            'Trump result': []
+            'Harris result': array('d'),
+            'Trump result': array('d')
         }
 
+    @staticmethod
+    def _safe_mean(a):
+        """
+        Returns the mean of the values in a, or 0.0 if a is empty.
+        """
+        return fmean(a) if a else 0.0
+
     def build_data_dict(self):
         """
         Reads all of the raw data from the CSV and builds a dictionary where
         each key is the name of a column in the CSV, and each value is a list
-        containing the data for each row under that column heading.
+        (or, for the numeric columns, a typed array) containing the data for
+        each row under that column heading.
 
         There may be a couple bugs in this that you will need to fix.
         Remember that the first row of a CSV contains all of the column names,
         and each value in a CSV is seperated by a comma.
-        """
 
-        # iterate through each row of the data
-        for i in self.raw_data[1:]:
-            # split up the row by column
-            parts = i.strip().split(',')  
-
-            month = parts[0]
-            date = int(parts[1])
-
-            sample_with_type = parts[2].strip()   
-            sample_num_str, sample_type = sample_with_type.split()
-            sample = int(sample_num_str)
-
-            harris = float(parts[3])
-            trump = float(parts[4])
-
-            # map each part of the row to the correct column
-            self.data_dict['month'].append(month)
-            self.data_dict['date'].append(date)
-            self.data_dict['sample'].append(sample)
-            self.data_dict['sample type'].append(sample_type)
-            self.data_dict['Harris result'].append(harris)
-            self.data_dict['Trump result'].append(trump)
+        Calling this more than once does nothing after the first call.
+        """
+        if self._built:
+            return
+
+        # read the whole file in one go and split it into a list of lines
+        with open(self.full_path, 'r') as f:
+            self.raw_data = f.read().splitlines()
+
+        # split up every row by column, skipping the header row and any
+        # blank lines, and keep only the five columns we use
+        reader = csv.reader(self.raw_data)
+        next(reader)
+        rows = []
+        for parts in reader:
+            if not parts:
+                continue
+            if len(parts) < 5:
+                raise ValueError(
+                    f"line {reader.line_num}: expected 5 fields, got {len(parts)}")
+            rows.append(parts[:5])
+
+        # transpose the rows into columns so each column can be converted in
+        # a single pass; a file with only the header row has no rows to
+        # transpose, so fall back to empty columns
+        cols = list(zip(*rows)) if rows else [()] * 5
+        months, dates, samples, harris, trump = cols
+
+        # each sample looks like "1880 LV", so split off the sample type
+        sample_nums, sample_types = [], []
+        # bind the per-row lookups to local names before the loop
+        fullmatch = _SAMPLE_RE.fullmatch
+        num_app = sample_nums.append
+        type_app = sample_types.append
+        for sample in samples:
+            match = fullmatch(sample)
+            if match is None:
+                raise ValueError(f"malformed sample: {sample!r}")
+            num, st = match.groups()
+            num_app(num)
+            type_app(st)
+
+        harris_col = array('d', map(float, harris))
+        trump_col = array('d', map(float, trump))
+
+        # map each column to the correct key
+        self.data_dict['month'] = list(months)
+        self.data_dict['date'] = array('q', map(int, dates))
+        self.data_dict['sample'] = array('q', map(int, sample_nums))
+        self.data_dict['sample type'] = sample_types
+        self.data_dict['Harris result'] = harris_col
+        self.data_dict['Trump result'] = trump_col
+
+        # the Harris and Trump result columns as a pair, so the same
+        # calculation can be applied to each in turn
+        self._results = (harris_col, trump_col)
+
+        # the polling windows never change once the data is read, so work out
+        # their averages now
+        self._first30_mean = tuple(
+            self._safe_mean(col[:30]) for col in self._results)
+        self._last30_mean = tuple(
+            self._safe_mean(col[-30:]) for col in self._results)
+
+        # work out which rows are likely voter polls once, up front
+        self._lv_mask = [st == 'LV' for st in sample_types]
+
+        self._built = True
 
 
     def highest_polling_candidate(self):
@@ -89,15 +166,20 @@ class PollReader():
             str: A string indicating the candidate with the highest polling percentage or EVEN,
              and the highest polling percentage.
         """
+        # the data does not change once it is read, so only work this out once
+        if self._highest is not None:
+            return self._highest
+
         max_h = max(self.data_dict['Harris result'])
         max_t = max(self.data_dict['Trump result'])
 
         if abs(max_h - max_t) < 1e-12:
-            return f"EVEN {max_h*100:.1f}%"
+            self._highest = f"EVEN {max_h*100:.1f}%"
         elif max_h > max_t:
-            return f"Harris {max_h*100:.1f}%"
+            self._highest = f"Harris {max_h*100:.1f}%"
         else:
-            return f"Trump {max_t*100:.1f}%"
+            self._highest = f"Trump {max_t*100:.1f}%"
+        return self._highest
 
 
     def likely_voter_polling_average(self):
@@ -108,17 +190,15 @@ class PollReader():
             tuple: A tuple containing the average polling percentages for Harris and Trump
                    among likely voters, in that order.
         """
-        h_vals, t_vals = [], []
-        for st, h, t in zip(self.data_dict['sample type'],
-                        self.data_dict['Harris result'],
-                        self.data_dict['Trump result']):
-            if st == 'LV':
-                h_vals.append(h)
-                t_vals.append(t)
+        # keep running totals rather than collecting the likely voter results
+        h_sum = t_sum = 0.0
+        n = 0
+        for h, t in compress(zip(*self._results), self._lv_mask):
+            h_sum += h
+            t_sum += t
+            n += 1
 
-        h_avg = sum(h_vals) / len(h_vals) if h_vals else 0.0
-        t_avg = sum(t_vals) / len(t_vals) if t_vals else 0.0
-        return h_avg, t_avg
+        return (h_sum / n, t_sum / n) if n else (0.0, 0.0)
 
 
     def polling_history_change(self):
@@ -132,19 +212,8 @@ class PollReader():
             tuple: A tuple containing the net change for Harris and Trump, in that order.
                    Positive values indicate an increase, negative values indicate a decrease.
         """
-        h = self.data_dict['Harris result']
-        t = self.data_dict['Trump result']
-
-        latest_h = h[:30]
-        latest_t = t[:30]
-        earliest_h = h[-30:]
-        earliest_t = t[-30:]
-
-        latest_h_avg = sum(latest_h) / len(latest_h) if latest_h else 0.0
-        earliest_h_avg = sum(earliest_h) / len(earliest_h) if earliest_h else 0.0
-
-        latest_t_avg = sum(latest_t) / len(latest_t) if latest_t else 0.0
-        earliest_t_avg = sum(earliest_t) / len(earliest_t) if earliest_t else 0.0
+        latest_h_avg, latest_t_avg = self._first30_mean
+        earliest_h_avg, earliest_t_avg = self._last30_mean
 
         return (latest_h_avg - earliest_h_avg, latest_t_avg - earliest_t_avg)
 
@@ -153,9 +222,10 @@ class TestPollReader(unittest.TestCase):
     """
     Test cases for the PollReader class.
     """
-    def setUp(self):
-        self.poll_reader = PollReader('polling_data.csv')
-        self.poll_reader.build_data_dict()
+    @classmethod
+    def setUpClass(cls):
+        cls.poll_reader = PollReader('polling_data.csv')
+        cls.poll_reader.build_data_dict()
 
     def test_build_data_dict(self):
         self.assertEqual(len(self.poll_reader.data_dict['date']), len(self.poll_reader.data_dict['sample']))
@@ -164,6 +234,59 @@ class TestPollReader(unittest.TestCase):
         self.assertTrue(all(isinstance(x, str) for x in self.poll_reader.data_dict['sample type']))
         self.assertTrue(all(isinstance(x, float) for x in self.poll_reader.data_dict['Harris result']))
         self.assertTrue(all(isinstance(x, float) for x in self.poll_reader.data_dict['Trump result']))
+        self.assertEqual(self.poll_reader.data_dict['date'].typecode, 'q')
+        self.assertEqual(self.poll_reader.data_dict['sample'].typecode, 'q')
+        self.assertEqual(self.poll_reader.data_dict['Harris result'].typecode, 'd')
+        self.assertEqual(self.poll_reader.data_dict['Trump result'].typecode, 'd')
+
+    def test_build_data_dict_twice(self):
+        poll_reader = PollReader('polling_data.csv')
+        poll_reader.build_data_dict()
+        lengths = {key: len(col) for key, col in poll_reader.data_dict.items()}
+        poll_reader.build_data_dict()
+        self.assertEqual({key: len(col) for key, col in poll_reader.data_dict.items()}, lengths)
+
+    def test_build_data_dict_header_only(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('month,date,sample,Harris result,Trump result\n')
+        self.addCleanup(os.remove, f.name)
+
+        poll_reader = PollReader(f.name)
+        poll_reader.build_data_dict()
+        self.assertTrue(all(len(col) == 0 for col in poll_reader.data_dict.values()))
+        self.assertEqual(poll_reader.likely_voter_polling_average(), (0.0, 0.0))
+        self.assertEqual(poll_reader.polling_history_change(), (0.0, 0.0))
+
+    def test_build_data_dict_trailing_blank_line(self):
+        with open(self.poll_reader.full_path) as src:
+            contents = src.read()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(contents.rstrip('\r\n') + '\n\n')
+        self.addCleanup(os.remove, f.name)
+
+        poll_reader = PollReader(f.name)
+        poll_reader.build_data_dict()
+        self.assertTrue(all(len(col) == 109 for col in poll_reader.data_dict.values()))
+
+    def test_build_data_dict_short_row(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('month,date,sample,Harris result,Trump result\n')
+            f.write('sept,19,1880 LV,0.51\n')
+        self.addCleanup(os.remove, f.name)
+
+        poll_reader = PollReader(f.name)
+        with self.assertRaisesRegex(ValueError, 'line 2'):
+            poll_reader.build_data_dict()
+
+    def test_build_data_dict_malformed_sample(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('month,date,sample,Harris result,Trump result\n')
+            f.write('sept,19,1880,0.51,0.45\n')
+        self.addCleanup(os.remove, f.name)
+
+        poll_reader = PollReader(f.name)
+        with self.assertRaisesRegex(ValueError, "'1880'"):
+            poll_reader.build_data_dict()
 
     def test_highest_polling_candidate(self):
         result = self.poll_reader.highest_polling_candidate()
@@ -171,6 +294,13 @@ class TestPollReader(unittest.TestCase):
         self.assertTrue("Harris" in result)
         self.assertTrue("57.0%" in result)
 
+    def test_highest_polling_candidate_memoized(self):
+        poll_reader = PollReader('polling_data.csv')
+        poll_reader.build_data_dict()
+        first = poll_reader.highest_polling_candidate()
+        poll_reader.data_dict['Harris result'] = array('d', [0.99])
+        self.assertEqual(poll_reader.highest_polling_candidate(), first)
+
     def test_likely_voter_polling_average(self):
         harris_avg, trump_avg = self.poll_reader.likely_voter_polling_average()
         self.assertTrue(isinstance(harris_avg, float))
@@ -206,5 +336,10 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
-    unittest.main(verbosity=2)
\ No newline at end of file
+    # run the tests with "python PollReader.py test", otherwise just print
+    # the results
+    if 'test' in sys.argv[1:]:
+        sys.argv.remove('test')
+        unittest.main(verbosity=2)
+    else:
+        main()
\ No newline at end of file